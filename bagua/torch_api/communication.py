@@ -1,4 +1,8 @@
+import collections
+import inspect
+import json
 import logging
+from typing import Deque, Optional
 import torch
 import torch.distributed as dist
 import torch.distributed.distributed_c10d as c10d
@@ -9,15 +13,30 @@ from .env import (
     get_world_size,
     get_rank,
     get_local_rank,
-    get_local_size,
     get_autotune_server_addr,
+    get_node_topology,
 )
 from ..service.autotune_service import AutotuneClient
 from .exceptions import RepeatedInitializationError
-from .utils import flatten, unflatten, to_bagua_datatype
+from .utils import (
+    flatten,
+    unflatten,
+    get_flattened_view,
+    get_flat_buffer,
+    to_bagua_tensor,
+)
 from ..bagua_define import BaguaHyperparameter
 
 _global_state = None
+# events reused across collectives, so that the hot path does not create a
+# new CUDA event on every call
+_event_pool: Deque[torch.cuda.Event] = collections.deque()
+# upper bound of CUDA graphs kept per communicator by `allreduce`
+_MAX_CUDA_GRAPHS = 64
+# the thread local capture error mode of `torch.cuda.graph` needs PyTorch >= 2.1
+_CUDA_GRAPH_SUPPORTED = hasattr(torch.cuda, "graph") and (
+    "capture_error_mode" in inspect.signature(torch.cuda.graph.__init__).parameters
+)
 
 
 def _get_global_state():
@@ -60,18 +79,26 @@ class BaguaGlobalState(object):
         if device_id is None:
             device_id = get_local_rank()
         self.backend = B.BaguaCommBackendPy(100, device_id=device_id)
-        self.stream = torch.cuda.Stream(priority=-1)
+        # hierarchical ops run intra-node reduce, inter-node allreduce and
+        # intra-node broadcast on the same buffer, so the internode and
+        # intranode communicators share a stream to keep those steps ordered
+        self.hierarchical_stream = torch.cuda.Stream(priority=-1)
+        self.global_stream = torch.cuda.Stream(priority=-1)
         self.store = store
         self.hyperparameters = BaguaHyperparameter()
         self.hyperparameters_service_client = AutotuneClient(get_autotune_server_addr())
-        self.internode_communicator = init_bagua_inter_communicator(
-            stream=self.stream, leader_rank=0, store=self.store, device_id=device_id
-        )
-        self.intranode_communicator = init_bagua_intra_communicator(
-            stream=self.stream, store=self.store, device_id=device_id
-        )
-        self.global_communicator = init_bagua_communicator(
-            stream=self.stream, store=self.store, device_id=device_id
+        self.topology = get_node_topology()
+        (
+            self.internode_communicator,
+            self.intranode_communicator,
+            self.global_communicator,
+        ) = init_bagua_communicators(
+            inter_stream=self.hierarchical_stream,
+            intra_stream=self.hierarchical_stream,
+            global_stream=self.global_stream,
+            store=self.store,
+            device_id=device_id,
+            topology=self.topology,
         )
 
     def get_internode_communicator(self):
@@ -111,19 +138,96 @@ def gen_nccl_unique_id(comm_type: str, root=0, store=None):
     return idstr
 
 
-def init_bagua_inter_communicator(stream, leader_rank=0, store=None, device_id=None):
+def gen_nccl_unique_ids(store=None, topology=None):
+    """
+    Generates the NCCL unique ids of the internode, intranode and global
+    communicators.
+
+    The internode and global ids are generated on rank 0 and exchanged through
+    `store`. Each intranode id is generated on its node leader.
+
+    Returns:
+        A tuple ``(inter_id, intra_id, global_id)`` for the current rank.
+    """
+    key = "bagua_nccl_unique_ids"
+
+    if store is None:
+        store = c10d._get_default_store()
+    if topology is None:
+        topology = get_node_topology()
+
+    if topology.rank == 0:
+        gen_id = B.BaguaSingleCommunicatorPy.generate_nccl_unique_id_str
+        ids = {
+            "bagua_inter_comm": gen_id(),
+            "bagua_global_comm": gen_id(),
+        }
+        store.set(key, json.dumps(ids))
+    else:
+        ids = json.loads(str(store.get(key), encoding="utf-8"))
+
+    intra_id = gen_nccl_unique_id(
+        "bagua_intra_comm", root=topology.leader_rank, store=store
+    )
+
+    return ids["bagua_inter_comm"], intra_id, ids["bagua_global_comm"]
+
+
+def init_bagua_communicators(
+    inter_stream, intra_stream, global_stream, store=None, device_id=None, topology=None
+):
+    """
+    Creates the internode, intranode and global communicators of the current
+    process. Their NCCL unique ids are generated by `gen_nccl_unique_ids`,
+    which is the only place they are exchanged.
+
+    Returns:
+        A tuple ``(internode_communicator, intranode_communicator, global_communicator)``.
+        The internode communicator is None on processes that are not node leaders.
+    """
+    if topology is None:
+        topology = get_node_topology()
+
+    inter_id, intra_id, global_id = gen_nccl_unique_ids(store=store, topology=topology)
+    # NOTE: the communicators are initialized one after the other, since every
+    # constructor blocks until all of its peers joined. Initializing them
+    # concurrently needs ncclGroupStart/ncclGroupEnd around the ncclCommInitRank
+    # calls, which bagua-core does not expose.
+    internode_communicator = init_bagua_inter_communicator(
+        stream=inter_stream,
+        nccl_unique_id=inter_id,
+        device_id=device_id,
+        topology=topology,
+    )
+    intranode_communicator = init_bagua_intra_communicator(
+        stream=intra_stream,
+        nccl_unique_id=intra_id,
+        device_id=device_id,
+        topology=topology,
+    )
+    global_communicator = init_bagua_communicator(
+        stream=global_stream,
+        nccl_unique_id=global_id,
+        device_id=device_id,
+        topology=topology,
+    )
+    return internode_communicator, intranode_communicator, global_communicator
+
+
+def init_bagua_inter_communicator(
+    stream, nccl_unique_id, leader_rank=0, device_id=None, topology=None
+):
     if device_id is None:
         device_id = get_local_rank()
-    nccl_unique_id = gen_nccl_unique_id(
-        "bagua_inter_comm", root=leader_rank, store=store
-    )
+    if topology is None:
+        topology = get_node_topology()
 
-    if get_rank() % get_local_size() != leader_rank:
+    if topology.local_rank != leader_rank:
         return None
 
     comm = B.BaguaSingleCommunicatorPy(
-        rank=get_rank() // get_local_size(),
-        nranks=get_world_size() // get_local_size(),
+        rank=topology.node_id,
+        nranks=topology.inter_nranks,
         device_id=device_id,
         stream_ptr=stream.cuda_stream,
         nccl_unique_id_str=nccl_unique_id,
@@ -135,18 +239,17 @@ def init_bagua_inter_communicator(stream, leader_rank=0, store=None, device_id=N
     return comm
 
 
-def init_bagua_intra_communicator(stream, store=None, device_id=None):
+def init_bagua_intra_communicator(
+    stream, nccl_unique_id, device_id=None, topology=None
+):
     if device_id is None:
         device_id = get_local_rank()
-    nccl_unique_id = gen_nccl_unique_id(
-        "bagua_intra_comm",
-        root=get_rank() // get_local_size() * get_local_size(),
-        store=store,
-    )
+    if topology is None:
+        topology = get_node_topology()
 
     comm = B.BaguaSingleCommunicatorPy(
-        rank=get_rank() % get_local_size(),
-        nranks=get_local_size(),
+        rank=topology.local_rank,
+        nranks=topology.local_size,
         device_id=device_id,
         stream_ptr=stream.cuda_stream,
         nccl_unique_id_str=nccl_unique_id,
@@ -158,14 +261,15 @@ def init_bagua_intra_communicator(stream, store=None, device_id=None):
     return comm
 
 
-def init_bagua_communicator(stream, store=None, device_id=None):
+def init_bagua_communicator(stream, nccl_unique_id, device_id=None, topology=None):
     if device_id is None:
         device_id = get_local_rank()
-    nccl_unique_id = gen_nccl_unique_id("bagua_global_comm", store=store)
+    if topology is None:
+        topology = get_node_topology()
 
     comm = B.BaguaSingleCommunicatorPy(
-        rank=get_rank(),
-        nranks=get_world_size(),
+        rank=topology.rank,
+        nranks=topology.world_size,
         device_id=device_id,
         stream_ptr=stream.cuda_stream,
         nccl_unique_id_str=nccl_unique_id,
@@ -177,36 +281,145 @@ def init_bagua_communicator(stream, store=None, device_id=None):
     return comm
 
 
-def broadcast_coalesced(tensors, root=0, comm: B.BaguaSingleCommunicatorPy = None):
+def _get_bagua_tensor(tensor):
+    """
+    Returns a `B.BaguaTensorPy` describing `tensor`. The descriptor is cached on
+    the tensor and reused by later collectives on the same tensor.
+    """
+    ptr = tensor.data_ptr()
+    device_id = tensor.device.index
+    cached = getattr(tensor, "_bagua_descriptor", None)
+    if cached is not None:
+        cached_ptr, num_elem, dtype, cached_device_id, b_tensor = cached
+        if (
+            num_elem == tensor.numel()
+            and dtype == tensor.dtype
+            and cached_device_id == device_id
+        ):
+            if cached_ptr != ptr:
+                b_tensor.reset_ptr(ptr)
+                tensor._bagua_descriptor = (ptr, num_elem, dtype, device_id, b_tensor)
+            return b_tensor
+
+    b_tensor = to_bagua_tensor(tensor)
+    tensor._bagua_descriptor = (
+        ptr,
+        tensor.numel(),
+        tensor.dtype,
+        device_id,
+        b_tensor,
+    )
+    return b_tensor
+
+
+def _acquire_event():
+    return _event_pool.pop() if _event_pool else torch.cuda.Event()
+
+
+def _release_event(event):
+    # safe to reuse right away: a wait enqueued with `wait_event` is bound to
+    # the record preceding it, not to later records of the same event
+    _event_pool.append(event)
+
+
+def _wait_current_stream(comm):
+    current_stream = torch.cuda.current_stream()
+    # work issued on the communicator stream itself is already ordered
+    if current_stream == comm.cuda_stream:
+        return
+
+    event = _acquire_event()
+    event.record(current_stream)
+    comm.cuda_stream.wait_event(event)
+    _release_event(event)
+
+
+def _wait_and_return_event(tensors, comm, async_op):
+    if async_op:
+        event = _acquire_event()
+        event.record(comm.cuda_stream)
+        for tensor in tensors:
+            # keep the caching allocator from reusing the memory before the
+            # collective on the communicator stream finishes
+            tensor.record_stream(comm.cuda_stream)
+            tensor._bagua_pending_event = event
+        event._bagua_pending_tensors = list(tensors)
+        return event
+
+    current_stream = torch.cuda.current_stream()
+    if current_stream == comm.cuda_stream:
+        return
+
+    event = _acquire_event()
+    event.record(comm.cuda_stream)
+    current_stream.wait_event(event)
+    _release_event(event)
+
+
+def wait(tensor_or_event):
+    """
+    Makes the current stream wait for a collective launched with `async_op=True`.
+
+    Arguments:
+    * `tensor_or_event`(_torch.Tensor_ or _torch.cuda.Event_) - The event returned by the collective, or one of
+      the tensors passed to it.
+
+    The event is recycled for later collectives afterwards and must not be used again. Waiting on a tensor
+    without pending collective does nothing.
+    """
+    if isinstance(tensor_or_event, torch.Tensor):
+        event = getattr(tensor_or_event, "_bagua_pending_event", None)
+        if event is None:
+            return
+    else:
+        event = tensor_or_event
+
+    tensors = getattr(event, "_bagua_pending_tensors", None)
+    if tensors is None:
+        # already waited on and recycled
+        return
+
+    torch.cuda.current_stream().wait_event(event)
     for tensor in tensors:
-        assert tensor.device != torch.device(
-            "cpu"
-        ), "input tensors must be CUDA and dense"
+        # the tensor may have been passed to a later collective meanwhile
+        if tensor._bagua_pending_event is event:
+            tensor._bagua_pending_event = None
+    event._bagua_pending_tensors = None
+    _release_event(event)
+
+
+def broadcast_coalesced(
+    tensors, root=0, comm: B.BaguaSingleCommunicatorPy = None, async_op: bool = False
+):
+    for tensor in tensors:
+        assert tensor.is_cuda, "input tensors must be CUDA and dense"
 
     if comm is None:
         comm = _get_global_state().get_global_communicator()
 
-    event = torch.cuda.current_stream().record_event()
-    comm.cuda_stream.wait_event(event)
+    _wait_current_stream(comm)
+
+    # tensors already sharing one contiguous storage (e.g. flattened params)
+    # are broadcast in place, skipping the flatten and copy back
+    coalesced = get_flattened_view(tensors)
+    if coalesced is not None:
+        comm.broadcast(to_bagua_tensor(coalesced), root)
+        return _wait_and_return_event(tensors, comm, async_op)
 
     with torch.cuda.stream(comm.cuda_stream):
         coalesced = flatten(tensors)
-        b_coalesced = B.BaguaTensorPy(
-            ptr=coalesced.data_ptr(),
-            num_elem=coalesced.numel(),
-            num_elem_allocated=coalesced.numel(),
-            dtype=to_bagua_datatype(coalesced.dtype),
-            device_id=coalesced.device.index,
-        )
+        b_coalesced = to_bagua_tensor(coalesced)
         comm.broadcast(b_coalesced, root)
 
         for buf, synced in zip(tensors, unflatten(coalesced, tensors)):
             buf.copy_(synced)
 
-    torch.cuda.synchronize()
+    return _wait_and_return_event(tensors, comm, async_op)
 
 
-def broadcast(tensor, root=0, comm: B.BaguaSingleCommunicatorPy = None):
+def broadcast(
+    tensor, root=0, comm: B.BaguaSingleCommunicatorPy = None, async_op: bool = False
+):
     """
     Broadcasts the tensor to the whole communicator.
 
@@ -216,71 +429,126 @@ def broadcast(tensor, root=0, comm: B.BaguaSingleCommunicatorPy = None):
     * `tensor`(_torch.Tensor_) - Data to be sent if `root` is the rank of current process, and tensor to be used to save received data otherwise.
     * `root`(_int_) - Source rank.
     * `comm`(_B.BaguaSingleCommunicatorPy_) - The bagua communicator to work on. If None, the global bagua communicator will be used.
+    * `async_op`(_bool_) - If True, return a `torch.cuda.Event` recorded on the communicator stream instead of
+      making the current stream wait for the collective. The consumer must call `wait(event)` or `wait(tensor)`
+      before reading `tensor`, which also recycles the event.
 
     Note: To broadcast a list of tensors, use `broadcast_coalesced` instead.
     """
 
-    assert tensor.device != torch.device("cpu"), "input tensor must be CUDA and dense"
+    assert tensor.is_cuda, "input tensor must be CUDA and dense"
 
     if comm is None:
         comm = _get_global_state().get_global_communicator()
 
-    event = torch.cuda.current_stream().record_event()
-    comm.cuda_stream.wait_event(event)
+    _wait_current_stream(comm)
 
-    with torch.cuda.stream(comm.cuda_stream):
-        b_tensor = B.BaguaTensorPy(
-            ptr=tensor.data_ptr(),
-            num_elem=tensor.numel(),
-            num_elem_allocated=tensor.numel(),
-            dtype=to_bagua_datatype(tensor.dtype),
-            device_id=tensor.device.index,
-        )
-        comm.broadcast(b_tensor, root)
+    # the communicator launches on its own stream, no stream switch needed
+    comm.broadcast(_get_bagua_tensor(tensor), root)
+
+    return _wait_and_return_event([tensor], comm, async_op)
 
-    torch.cuda.synchronize()
+
+def _check_compression(compression):
+    if compression not in [None, "fp16"]:
+        raise ValueError("Illegal compression: {}".format(compression))
+
+
+def _allreduce_fp16(tensor, comm, average):
+    """
+    Allreduces a float32 `tensor` in place, sending it in half precision. Must
+    be called on the communicator stream.
+    """
+    scratch = torch.empty_like(
+        tensor, dtype=torch.float16, memory_format=torch.contiguous_format
+    )
+    # magnitudes above 65504 become inf at the cast. Averaging before the cast
+    # keeps the half precision sum within the inputs' range, but flushes more
+    # small values to zero. Without averaging the sum itself may overflow.
+    if average:
+        torch.div(tensor, comm.nranks(), out=scratch)
+    else:
+        scratch.copy_(tensor)
+
+    comm.allreduce(to_bagua_tensor(scratch))
+    tensor.copy_(scratch)
 
 
 def allreduce_coalesced(
     tensors,
     comm: B.BaguaSingleCommunicatorPy = None,
     average: bool = True,
+    async_op: bool = False,
+    fuse_mode: str = "auto",
+    compression: Optional[str] = None,
 ):
+    """
+    Reduces a list of tensors across all machines, see `allreduce`.
+
+    Arguments:
+    * `fuse_mode`(_str_) - How tensors are fused into one collective. "auto" reduces tensors already laid out
+      contiguously in one storage in place and copies them into a temporary buffer otherwise. "flatten" always
+      copies them into a temporary buffer. "persistent" moves the tensors into a contiguous buffer on first use
+      (see `utils.get_flat_buffer`), so that later calls reduce them in place. It changes the storage of the
+      tensors and rejects views of other tensors.
+    * `compression`(_str_) - See `allreduce`.
+    """
+
+    if fuse_mode not in ["auto", "flatten", "persistent"]:
+        raise ValueError("Illegal fuse mode: {}".format(fuse_mode))
+    _check_compression(compression)
+
     for tensor in tensors:
-        assert tensor.device != torch.device(
-            "cpu"
-        ), "input tensors must be CUDA and dense"
+        assert tensor.is_cuda, "input tensors must be CUDA and dense"
 
     if comm is None:
         comm = _get_global_state().get_global_communicator()
 
-    event = torch.cuda.current_stream().record_event()
-    comm.cuda_stream.wait_event(event)
+    # tensors sharing one contiguous storage (e.g. flattened params) are
+    # reduced in place, skipping the flatten and copy back
+    coalesced = None
+    if fuse_mode == "auto":
+        coalesced = get_flattened_view(tensors)
+    elif fuse_mode == "persistent":
+        coalesced = get_flat_buffer(tensors)
+    inplace = coalesced is not None
 
-    with torch.cuda.stream(comm.cuda_stream):
-        coalesced = flatten(tensors)
-        b_coalesced = B.BaguaTensorPy(
-            ptr=coalesced.data_ptr(),
-            num_elem=coalesced.numel(),
-            num_elem_allocated=coalesced.numel(),
-            dtype=to_bagua_datatype(coalesced.dtype),
-            device_id=coalesced.device.index,
-        )
-        comm.allreduce(b_coalesced)
-
-        if average:
-            coalesced /= comm.nranks()
-
-        for buf, synced in zip(tensors, unflatten(coalesced, tensors)):
-            buf.copy_(synced)
+    _wait_current_stream(comm)
 
-    torch.cuda.synchronize()
+    with torch.cuda.stream(comm.cuda_stream):
+        if not inplace:
+            coalesced = flatten(tensors)
+
+        if compression == "fp16" and coalesced.dtype == torch.float32:
+            _allreduce_fp16(coalesced, comm, average)
+            # already averaged before the cast
+            average = False
+        else:
+            comm.allreduce(to_bagua_tensor(coalesced))
+
+        if inplace:
+            if average:
+                coalesced.div_(comm.nranks())
+        elif average:
+            # fold the averaging into the copy back, saving a full pass over
+            # the coalesced buffer
+            nranks = comm.nranks()
+            for buf, synced in zip(tensors, unflatten(coalesced, tensors)):
+                torch.div(synced, nranks, out=buf)
+        else:
+            for buf, synced in zip(tensors, unflatten(coalesced, tensors)):
+                buf.copy_(synced)
+
+    return _wait_and_return_event(tensors, comm, async_op)
 
 
 def allreduce(
     tensor,
     comm: B.BaguaSingleCommunicatorPy = None,
     average: bool = True,
+    async_op: bool = False,
+    compression: Optional[str] = None,
+    enable_cuda_graph: bool = False,
 ):
     """
     Reduces the tensor data across all machines in such a way that all get the final result.
@@ -290,29 +558,119 @@ def allreduce(
     * `tensor`(_torch.Tensor_) - Input and output of the collective. The function operates in-place.
     * `comm`(_B.BaguaSingleCommunicatorPy_) - The bagua communicator to work on. If None, the global bagua communicator will be used.
     * `average`(_bool_) - Average the reduced tensor or not.
+    * `async_op`(_bool_) - If True, return a `torch.cuda.Event` recorded on the communicator stream instead of
+      making the current stream wait for the collective. The consumer must call `wait(event)` or `wait(tensor)`
+      before reading `tensor`, which also recycles the event.
+    * `compression`(_str_) - If "fp16", float32 tensors are sent in half precision, halving the communicated
+      bytes at the cost of precision. Values above 65504 become inf at the cast, and with `average=False` the
+      half precision sum can overflow too. With `average=True` the tensor is divided before the cast, which makes
+      small values more likely to underflow to zero. Other dtypes are sent as is. If None, no compression is
+      applied.
+    * `enable_cuda_graph`(_bool_) - If True, the collective is captured into a CUDA graph on the first call for
+      a given tensor memory, size and dtype, and later calls replay that graph, cutting the per call launch
+      overhead. Suited for tensors reduced every step at a fixed address, such as gradient buckets. Each capture
+      runs the device wide `torch.cuda.synchronize()`, `gc.collect()` and `torch.cuda.empty_cache()` that
+      `torch.cuda.graph` performs when it starts. Requires PyTorch >= 2.1, NCCL >= 2.9, and a bagua-core whose
+      allreduce only enqueues work on the communicator stream, without host synchronization or event queries,
+      since those are not allowed while capturing. With an older PyTorch the collective runs without a graph.
+      Graphs are kept per communicator up to a fixed number, `clear_cuda_graphs` drops them.
 
     Note: To allreduce a list of tensors, use `allreduce_coalesced` instead.
     """
 
-    assert tensor.device != torch.device("cpu"), "input tensor must be CUDA and dense"
+    _check_compression(compression)
+    assert tensor.is_cuda, "input tensor must be CUDA and dense"
 
     if comm is None:
         comm = _get_global_state().get_global_communicator()
 
-    event = torch.cuda.current_stream().record_event()
-    comm.cuda_stream.wait_event(event)
+    _wait_current_stream(comm)
+
+    # inside an outer capture, launch eagerly so the collective is recorded
+    # into the outer graph instead
+    if (
+        enable_cuda_graph
+        and _CUDA_GRAPH_SUPPORTED
+        and not torch.cuda.is_current_stream_capturing()
+    ):
+        _allreduce_graphed(tensor, comm, average, compression)
+        return _wait_and_return_event([tensor], comm, async_op)
+
+    if compression == "fp16" and tensor.dtype == torch.float32:
+        with torch.cuda.stream(comm.cuda_stream):
+            _allreduce_fp16(tensor, comm, average)
+        return _wait_and_return_event([tensor], comm, async_op)
+
+    # the communicator launches on its own stream, only switch streams for
+    # the torch kernels chained after it
+    comm.allreduce(_get_bagua_tensor(tensor))
+
+    if average:
+        with torch.cuda.stream(comm.cuda_stream):
+            tensor.div_(comm.nranks())
+
+    return _wait_and_return_event([tensor], comm, async_op)
+
+
+def _allreduce_graphed(tensor, comm, average, compression):
+    """
+    Replays a CUDA graph of the allreduce of `tensor` on the communicator
+    stream, capturing it on first use. At most `_MAX_CUDA_GRAPHS` graphs are
+    kept per communicator, least recently used ones are dropped first.
+    """
+    graphs = getattr(comm, "cuda_graphs", None)
+    if graphs is None:
+        graphs = comm.cuda_graphs = collections.OrderedDict()
+
+    key = (tensor.data_ptr(), tensor.numel(), tensor.dtype, average, compression)
+    graph = graphs.get(key)
+    if graph is None:
+        if len(graphs) >= _MAX_CUDA_GRAPHS:
+            # a dropped graph releases its memory pool, which must not happen
+            # while a replay of it is still running
+            comm.cuda_stream.synchronize()
+            graphs.popitem(last=False)
+
+        graph = torch.cuda.CUDAGraph()
+        # thread local error mode, so that CUDA calls made by the backend
+        # threads meanwhile do not invalidate the capture
+        with torch.cuda.graph(
+            graph, stream=comm.cuda_stream, capture_error_mode="thread_local"
+        ):
+            if compression == "fp16" and tensor.dtype == torch.float32:
+                _allreduce_fp16(tensor, comm, average)
+            else:
+                comm.allreduce(to_bagua_tensor(tensor))
+                if average:
+                    tensor.div_(comm.nranks())
+        graphs[key] = graph
+    else:
+        graphs.move_to_end(key)
 
     with torch.cuda.stream(comm.cuda_stream):
-        b_tensor = B.BaguaTensorPy(
-            ptr=tensor.data_ptr(),
-            num_elem=tensor.numel(),
-            num_elem_allocated=tensor.numel(),
-            dtype=to_bagua_datatype(tensor.dtype),
-            device_id=tensor.device.index,
-        )
-        comm.allreduce(b_tensor)
+        graph.replay()
 
-        if average:
-            tensor /= comm.nranks()
 
-    torch.cuda.synchronize()
+def clear_cuda_graphs(comm: B.BaguaSingleCommunicatorPy = None):
+    """
+    Drops the CUDA graphs captured by `allreduce(..., enable_cuda_graph=True)`, releasing their memory.
+
+    Arguments:
+    * `comm`(_B.BaguaSingleCommunicatorPy_) - The bagua communicator whose graphs are dropped. If None, the graphs
+      of all communicators of the global state are dropped.
+    """
+    if comm is None:
+        state = _get_global_state()
+        comms = [
+            state.get_internode_communicator(),
+            state.get_intranode_communicator(),
+            state.get_global_communicator(),
+        ]
+    else:
+        comms = [comm]
+
+    for c in comms:
+        graphs = getattr(c, "cuda_graphs", None) if c is not None else None
+        if graphs:
+            c.cuda_stream.synchronize()
+            graphs.clear()
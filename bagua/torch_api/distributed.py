@@ -22,6 +22,7 @@ from .env import (
 )
 from .utils import (
     to_bagua_datatype,
+    to_bagua_tensor,
     flatten_module_params,
     average_by_removing_extreme_values,
 )
@@ -259,12 +260,9 @@ class Reducer(object):
     def register_bagua_buckets(self):
         def new_bagua_tensor(param):
             p = self.fill_slot(param)
-            bagua_tensor = B.BaguaTensorPy(
-                ptr=p.data_ptr(),
-                num_elem=param.numel(),
+            bagua_tensor = to_bagua_tensor(
+                p,
                 num_elem_allocated=param.__dict__.get("allocated_size", param.numel()),
-                dtype=to_bagua_datatype(param.dtype),
-                device_id=p.device.index,
             )
             param.bagua_tensor = bagua_tensor
             param_name = self.param_name[id(param)]
@@ -1,4 +1,19 @@
 import os
+from typing import NamedTuple
+
+_WORLD_SIZE = None
+_RANK = None
+_LOCAL_RANK = None
+_LOCAL_SIZE = None
+
+
+def _reset_env_cache():
+    """
+    Clears the cached values, so that the environment variables are read again
+    on the next call. Only intended for tests.
+    """
+    global _WORLD_SIZE, _RANK, _LOCAL_RANK, _LOCAL_SIZE
+    _WORLD_SIZE = _RANK = _LOCAL_RANK = _LOCAL_SIZE = None
 
 
 def get_world_size():
@@ -9,7 +24,10 @@ def get_world_size():
         The world size of the process group
 
     """
-    return int(os.environ.get("WORLD_SIZE", 1))
+    global _WORLD_SIZE
+    if _WORLD_SIZE is None:
+        _WORLD_SIZE = int(os.environ.get("WORLD_SIZE", 1))
+    return _WORLD_SIZE
 
 
 def get_rank():
@@ -24,7 +42,10 @@ def get_rank():
         The rank of the process group
 
     """
-    return int(os.environ.get("RANK", 0))
+    global _RANK
+    if _RANK is None:
+        _RANK = int(os.environ.get("RANK", 0))
+    return _RANK
 
 
 def get_local_rank():
@@ -38,7 +59,10 @@ def get_local_rank():
         The local rank of the node
 
     """
-    return int(os.environ.get("LOCAL_RANK", 0))
+    global _LOCAL_RANK
+    if _LOCAL_RANK is None:
+        _LOCAL_RANK = int(os.environ.get("LOCAL_RANK", 0))
+    return _LOCAL_RANK
 
 
 def get_local_size():
@@ -49,7 +73,55 @@ def get_local_size():
         The local size of the node
 
     """
-    return int(os.environ.get("LOCAL_SIZE", 1))
+    global _LOCAL_SIZE
+    if _LOCAL_SIZE is None:
+        _LOCAL_SIZE = int(os.environ.get("LOCAL_SIZE", 1))
+    return _LOCAL_SIZE
+
+
+class NodeTopology(NamedTuple):
+    """
+    Position of the current process among nodes, see `get_node_topology`.
+    """
+
+    rank: int
+    world_size: int
+    # rank of the current process within its node
+    local_rank: int
+    local_size: int
+    # index of the node of the current process
+    node_id: int
+    # global rank of the first process of the node
+    leader_rank: int
+    # number of nodes
+    inter_nranks: int
+
+
+def get_node_topology():
+    """
+    Computes the node topology of the current process from the rank and sizes of
+    the process group.
+
+    Returns:
+        A `NodeTopology`
+
+    """
+    rank, world_size, local_size = get_rank(), get_world_size(), get_local_size()
+    if local_size <= 0 or world_size % local_size != 0:
+        raise ValueError(
+            f"world size {world_size} is not a multiple of local size {local_size}"
+        )
+
+    node_id = rank // local_size
+    return NodeTopology(
+        rank=rank,
+        world_size=world_size,
+        local_rank=rank % local_size,
+        local_size=local_size,
+        node_id=node_id,
+        leader_rank=node_id * local_size,
+        inter_nranks=world_size // local_size,
+    )
 
 
 def get_autotune_server_addr():
@@ -3,6 +3,7 @@ import torch.distributed as dist
 import torch
 import logging
 import numpy as np
+import bagua_core as B
 
 LOGGER = logging.getLogger(__name__)
 
@@ -69,6 +70,68 @@ def check_contiguous(tensors):
     return True
 
 
+def get_flattened_view(tensors):
+    """
+    Returns a 1-D view covering `tensors` if they are laid out back to back in
+    the same storage, so that they can be communicated without flattening.
+    Returns None otherwise.
+    """
+    first = tensors[0]
+    for t in tensors:
+        if (
+            t.dtype != first.dtype
+            or not t.is_contiguous()
+            or t.storage().data_ptr() != first.storage().data_ptr()
+        ):
+            return None
+
+    if not check_contiguous(tensors):
+        return None
+
+    total_size = sum(t.numel() for t in tensors)
+    with torch.no_grad():
+        view = torch.empty(0, dtype=first.dtype, device=first.device)
+        view.set_(first.storage(), first.storage_offset(), (total_size,))
+    return view
+
+
+def get_flat_buffer(tensors):
+    """
+    Returns a contiguous 1-D buffer backing `tensors`.
+
+    If `tensors` are not laid out back to back in the same storage yet, they are
+    copied into a newly allocated buffer and their storage is replaced by views
+    into it, in the same way as `flatten_module_params`. Later calls with the
+    same tensors return a view over that buffer without any allocation or copy.
+
+    All tensors must share the same dtype and device. Tensors that are views of
+    another tensor are rejected, since their base would no longer see writes to
+    the buffer. Tensors whose memory is registered elsewhere, e.g. with the
+    bagua backend, must not be passed either.
+    """
+    flat = get_flattened_view(tensors)
+    if flat is not None:
+        return flat
+
+    for t in tensors:
+        if t.dtype != tensors[0].dtype or t.device != tensors[0].device:
+            raise ValueError("all tensors of a flat buffer must share dtype and device")
+        if t._base is not None:
+            raise ValueError("cannot move a view of another tensor to a flat buffer")
+
+    flat = flatten(tensors)
+    flat_storage = flat.storage()
+    offset = 0
+    with torch.no_grad():
+        for t in tensors:
+            z = torch.empty(0, dtype=t.dtype, device=t.device)
+            z.set_(flat_storage, offset, t.shape)
+            t.data = z
+            offset += t.numel()
+
+    return flat
+
+
 def _get_params_flattened_aligned_size(params, align_bytes):
     assert align_bytes == 1 or (
         align_bytes % params[0].element_size() == 0
@@ -210,19 +273,37 @@ def new_param(weight, grad):
         return p
 
 
+_BAGUA_DATATYPES = {
+    torch.float32: "f32",
+    torch.float16: "f16",
+    torch.uint8: "u8",
+    torch.long: "i64",
+}
+
+
 def to_bagua_datatype(datatype):
-    if datatype == torch.float32:
-        return "f32"
-    elif datatype == torch.float16:
-        return "f16"
-    elif datatype == torch.uint8:
-        return "u8"
-    elif datatype == torch.long:
-        return "i64"
-    else:
+    try:
+        return _BAGUA_DATATYPES[datatype]
+    except KeyError:
         raise ValueError(f"unsupported data type {datatype}.")
 
 
+def to_bagua_tensor(tensor, num_elem_allocated=None):
+    """
+    Builds a `B.BaguaTensorPy` describing the memory of `tensor`.
+    """
+    num_elem = tensor.numel()
+    return B.BaguaTensorPy(
+        ptr=tensor.data_ptr(),
+        num_elem=num_elem,
+        num_elem_allocated=(
+            num_elem if num_elem_allocated is None else num_elem_allocated
+        ),
+        dtype=to_bagua_datatype(tensor.dtype),
+        device_id=tensor.device.index,
+    )
+
+
 def average_by_removing_extreme_values(raw_score_list):
     score_list = np.asarray(raw_score_list)
 
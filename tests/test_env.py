@@ -0,0 +1,55 @@
+import os
+import unittest
+from unittest import mock
+from bagua.torch_api import env
+
+
+class TestEnv(unittest.TestCase):
+    def setUp(self):
+        env._reset_env_cache()
+
+    def tearDown(self):
+        env._reset_env_cache()
+
+    def test_values_are_cached(self):
+        with mock.patch.dict(
+            os.environ,
+            {"RANK": "3", "WORLD_SIZE": "8", "LOCAL_RANK": "1", "LOCAL_SIZE": "2"},
+        ):
+            self.assertEqual(env.get_rank(), 3)
+            self.assertEqual(env.get_world_size(), 8)
+            self.assertEqual(env.get_local_rank(), 1)
+            self.assertEqual(env.get_local_size(), 2)
+
+        with mock.patch.dict(os.environ, {"RANK": "5"}):
+            self.assertEqual(env.get_rank(), 3)
+
+    def test_reset_env_cache(self):
+        with mock.patch.dict(os.environ, {"RANK": "3"}):
+            self.assertEqual(env.get_rank(), 3)
+
+        env._reset_env_cache()
+        with mock.patch.dict(os.environ, {"RANK": "5"}):
+            self.assertEqual(env.get_rank(), 5)
+
+    def test_node_topology(self):
+        with mock.patch.dict(
+            os.environ, {"RANK": "5", "WORLD_SIZE": "8", "LOCAL_SIZE": "4"}
+        ):
+            topology = env.get_node_topology()
+
+        self.assertEqual(topology.local_rank, 1)
+        self.assertEqual(topology.node_id, 1)
+        self.assertEqual(topology.leader_rank, 4)
+        self.assertEqual(topology.inter_nranks, 2)
+
+    def test_node_topology_invalid_local_size(self):
+        with mock.patch.dict(
+            os.environ, {"RANK": "0", "WORLD_SIZE": "6", "LOCAL_SIZE": "4"}
+        ):
+            with self.assertRaises(ValueError):
+                env.get_node_topology()
+
+
+if __name__ == "__main__":
+    unittest.main()
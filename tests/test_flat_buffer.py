@@ -0,0 +1,65 @@
+import unittest
+import torch
+from bagua.torch_api.utils import get_flattened_view, get_flat_buffer
+
+
+class TestFlatBuffer(unittest.TestCase):
+    def test_flattened_view_aliases_tensors(self):
+        base = torch.zeros(6)
+        tensors = [base[:2], base[2:]]
+
+        view = get_flattened_view(tensors)
+        self.assertIsNotNone(view)
+        self.assertEqual(view.numel(), 6)
+
+        view.add_(1)
+        self.assertTrue(torch.equal(base, torch.ones(6)))
+
+    def test_flattened_view_not_contiguous(self):
+        base = torch.zeros(6)
+        self.assertIsNone(get_flattened_view([base[:2], base[3:]]))
+        self.assertIsNone(get_flattened_view([torch.zeros(2), torch.zeros(3)]))
+
+    def test_flat_buffer_moves_tensors(self):
+        t1 = torch.tensor([1.0, 2.0])
+        t2 = torch.tensor([[3.0, 4.0], [5.0, 6.0]])
+
+        flat = get_flat_buffer([t1, t2])
+        self.assertTrue(torch.equal(flat, torch.arange(1.0, 7.0)))
+        self.assertEqual(t2.shape, (2, 2))
+
+        flat.mul_(2)
+        self.assertTrue(torch.equal(t1, torch.tensor([2.0, 4.0])))
+        self.assertTrue(torch.equal(t2, torch.tensor([[6.0, 8.0], [10.0, 12.0]])))
+
+        # tensors already live in the buffer, no new allocation
+        again = get_flat_buffer([t1, t2])
+        self.assertEqual(again.data_ptr(), flat.data_ptr())
+
+    def test_flat_buffer_rejects_views(self):
+        base = torch.arange(6.0)
+        tensors = [base[:2], base[3:]]
+
+        with self.assertRaises(ValueError):
+            get_flat_buffer(tensors)
+
+        # the base keeps receiving writes through the views
+        tensors[0].zero_()
+        self.assertTrue(torch.equal(base[:2], torch.zeros(2)))
+        self.assertEqual(tensors[0].data_ptr(), base.data_ptr())
+
+    def test_flat_buffer_rejects_mixed_dtypes(self):
+        t1 = torch.tensor([1.0, 2.0])
+        t2 = torch.tensor([3.0, 4.0], dtype=torch.float16)
+        ptr = t1.data_ptr()
+
+        with self.assertRaises(ValueError):
+            get_flat_buffer([t1, t2])
+
+        # no tensor was moved before the error
+        self.assertEqual(t1.data_ptr(), ptr)
+        self.assertTrue(torch.equal(t1, torch.tensor([1.0, 2.0])))
+
+
+if __name__ == "__main__":
+    unittest.main()